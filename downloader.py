@@ -11,42 +11,185 @@ Available under MIT license.
 from urllib.parse import urlparse
 from urllib.error import HTTPError
 from pathlib import Path
+import codecs
+import io
+import os
 # from exceptions import FileNotFoundError
 import shutil
+import tempfile
 import datetime
 import json
 import logging
 import re
+import threading
 import time
-from random import random, uniform
-from xml.etree import ElementTree
+from collections import OrderedDict
+from functools import lru_cache
 # external library
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except ImportError:
     raise ImportError("Package requests is not available. Install using e.g. "
             "`port install py-requests` or `pip install requests`.") from None
+# optional external library, for faster JSON decoding
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# optional external library, for lazy decoding of large JSON documents
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+# optional external library, to store objects derived from a cache file
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+# optional external library, for faster XML parsing
+try:
+    from lxml.etree import fromstring as _xml_fromstring
+except ImportError:
+    from xml.etree.ElementTree import fromstring as _xml_fromstring
+# optional external library, only required for get_cached_html()
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+# optional external library, for faster HTML parsing by BeautifulSoup
+try:
+    import lxml  # noqa (only used as BeautifulSoup parser)
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    _HTML_PARSER = 'html.parser'
 
 # type hints
 from http.client import HTTPResponse # noqa (only used for type hints)
+from typing import Any, BinaryIO, Callable, Dict, Optional, Set, Tuple
 URL = str
 
+# HTTP status codes of temporary errors, the number of retries, and the
+# delay in seconds before the first retry (doubled for each next retry).
+_RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+_MAX_RETRIES = 3
+_RETRY_BACKOFF = 0.6
+
+# The umask, to give cache files the same permissions as other new files.
+# (tempfile.mkstemp() creates files that are only readable by the owner.)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# sequence of non-word characters, replaced with _ in cache file names
+_NON_ALNUM_RE = re.compile(r'[^A-Za-z0-9]+')
+
+
+def _simdjson_parse(data: bytes):
+    """Parse JSON with simdjson. Returns a lazy document, with values decoded on access."""
+    try:
+        # Use a new parser for each document: a parser can only hold one document.
+        return simdjson.Parser().parse(data)
+    except RuntimeError as e:
+        # simdjson raises a RuntimeError for invalid JSON
+        raise ValueError(str(e)) from None
+
+
+def _parse_html(text: str):
+    """Parse HTML with BeautifulSoup, using the lxml parser if available."""
+    return BeautifulSoup(text, _HTML_PARSER)
+
+
+@lru_cache(maxsize=4096)
+def _url_to_short_filename(url: str, extension: str='.html', includehostname: bool=True) -> str:
+    """Get filename from path and query parameters name *id or *ids.
+    Includes the hostname as folder if includehostname is set.
+    The result only depends on the arguments, and is cached."""
+    pu = urlparse(url)
+    short_name = pu.path.strip('/')
+    short_name = _NON_ALNUM_RE.sub('_', short_name)
+    if short_name.endswith("json"):
+        short_name = short_name[:-5]
+        extension = ".json"
+    parts = [short_name]
+    for query in pu.query.split('&'):
+        try:
+            k, v = query.split('=')
+            k = k.lower()
+            if k.endswith('id') or k.endswith('ids') or k in ('params','volts'):
+                # replace sequence of non-word characters with _
+                v = _NON_ALNUM_RE.sub('_', v)
+                parts.append('_')
+                parts.append(k)
+                parts.append('_')
+                parts.append(v)
+        except (ValueError, IndexError):
+            pass  # ignore any errors
+    parts.append(extension)
+    short_name = ''.join(parts)
+    if includehostname:
+        return os.path.join(pu.hostname, short_name)
+    return short_name
+
+
 class CachedDownloader:
-    def __init__(self, cachefolder: Path = None, cache_enforce_chance=0.0, delay: float=0.2, includehostname=True) -> None:
+    def __init__(self, cachefolder: Path = None, cache_enforce_chance=0.0, delay: float=0.2, includehostname=True,
+                burst: int=5) -> None:
         # TODO: if not cachefolder: Create one in /var/tmp
         # Note: cache_enforce_chance is deprecated and ignored
+        # Downloads are throttled per host with a token bucket: up to `burst`
+        # requests may be made at once, after that one request per `delay` seconds.
         if cachefolder is None:
             cachefolder = Path(__file__).parent
         self.cachefolder = cachefolder.resolve()
         self.logger = logging.getLogger('cached-downloader')
         self.logger.debug(f"Set cachefolder to {self.cachefolder}")
         self.cachefolder.mkdir(parents=True, exist_ok=True)
+        # Folders known to exist, so they are only created once.
+        self._known_dirs = {str(self.cachefolder)}  # type: Set[str]
 
         self.session = requests.Session()
-        self.mindelay = 0.5*delay
-        self.maxdelay = 1.5*delay
-        self.prevtime = time.time() - self.maxdelay
+        # Keep enough connections alive for concurrent downloads, and retry
+        # failed connection attempts. Temporary server errors are retried by
+        # _get_response(), so that the retries are throttled like other requests.
+        retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.3,
+                      respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate = 1.0/delay if delay > 0 else 0.0  # requests per second
+        self.burst = burst
+        self._buckets = {}  # type: Dict[str, Tuple[float, float]]  # hostname -> (tokens, timestamp)
+        # Guards the buckets and memoized objects, so downloads can run in multiple threads.
+        self._lock = threading.Lock()
         self.includehostname = includehostname
+        # Decoded objects of recently read cache files, to avoid decoding the same file twice.
+        self._decoded = OrderedDict()  # type: OrderedDict[str, Tuple[float, str, Any]]  # path -> (mtime, decode_name, object)
+        self.max_decoded = 64
+
+    def _take_token(self, hostname: str) -> float:
+        """Take a token from the bucket of the given host, and sleep until
+        it is available if the bucket is empty. Return the delay in seconds."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens, timestamp = self._buckets.get(hostname, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - timestamp) * self.rate) - 1
+            self._buckets[hostname] = (tokens, now)
+        delay = -tokens / self.rate if tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _drain_bucket(self, hostname: str, duration: float) -> None:
+        """Empty the bucket of the given host, so that the next request
+        to the host is made after `duration` seconds."""
+        if self.rate:
+            with self._lock:
+                self._buckets[hostname] = (-duration * self.rate, time.monotonic())
 
     def add_cookie(self, name, value, domain, path='/'):
         self.session.cookies.set(name, value, domain=domain, path=path)
@@ -72,84 +215,69 @@ class CachedDownloader:
             self.logger.warning("Can't make backup to %s" % (destpath))
             raise
 
-    def _url_to_short_filename(self, url: str, extension: str='.html') -> Path:
+    def _url_to_short_filename(self, url: str, extension: str='.html') -> str:
         """Get filename from path and query parameters name *id or *ids.
-        does not include the hostname."""
-        pu = urlparse(url)
-        short_name = pu.path.strip('/')
-        short_name = re.sub(r'[^A-Za-z0-9]+', '_', short_name)
-        if short_name.endswith("json"):
-            short_name = short_name[:-5]
-            extension = ".json"
-        for query in pu.query.split('&'):
-            try:
-                k, v = query.split('=')
-                k = k.lower()
-                if k.endswith('id') or k.endswith('ids') or k in ('params','volts'):
-                    # replace sequence of non-word characters with _
-                    v = re.sub(r'[^A-Za-z0-9]+', '_', v)
-                    short_name += '_' + k + '_' + v
-            except (ValueError, IndexError):
-                pass  # ignore any errors
-        short_name += extension
-        if self.includehostname:
-            return Path(pu.hostname, short_name)
-        return short_name
+        Includes the hostname as folder if includehostname is set."""
+        return _url_to_short_filename(url, extension, self.includehostname)
 
     def get_cached_url(self, url: URL, cache_name: str=None, ttl: 
                 float=1.2, may_extend_cache: bool=False, 
                 cookies: dict={}, encoding='utf-8', 
                 decode_func=lambda x: x, decode_name='text', binary_mode=False,
-                **kwargs):
+                memoize: bool=False, **kwargs):
         """Return a Python object from URL or cache file.
-        The ttl is time-to-live of the cache file in days."""
+        The ttl is time-to-live of the cache file in days.
+        If memoize is True, the decoded object is kept in memory, and returned
+        as-is as long as the cache file is not modified."""
         if not cache_name:
             cache_name = self._url_to_short_filename(url)
-        file_path = self.cachefolder / cache_name
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path = self._cache_path(cache_name)
 
         _downloaded_data = False
         data = None
         finalurl = url
         use_cache = False
-        if file_path.exists() and time.time() - file_path.stat().st_mtime < ttl * 86400:
-            # file exists and is recent (or is not recent, but we enforce cache to trottle downloads)
-            self.logger.debug("Fetching %s" % (cache_name))
-            if binary_mode:
-                with file_path.open('rb') as f:
-                    data = f.read()
-            else:
-                with file_path.open('r', encoding=encoding) as f:
-                    data = f.read()
+        # Open the cache file first, and only then check if it is recent (EAFP).
+        # This costs one open() and one fstat(), instead of a stat() for exists(),
+        # another stat() for the mtime and finally an open().
+        try:
+            f = self._open_cache_file(file_path, binary_mode, encoding)
+        except FileNotFoundError:
+            pass
         else:
-            try:
-                delay = uniform(self.mindelay, self.maxdelay) + self.prevtime - time.time()
-                if delay > 0:
-                    time.sleep(delay)
-                self.logger.debug("Fetching %s (after %.1fs delay)" % (url, delay))
-                r = self.session.get(url, cookies=cookies)
-                self.prevtime = time.time()
-                if binary_mode:
-                    data = r.content
-                else:
-                    data = r.text
-                finalurl = r.url
-                if finalurl != url:
-                    self.logger.info("%s redirects to %s." % (url, finalurl))
-                r.raise_for_status()
-                _downloaded_data = True
-            except requests.ConnectionError as exc:
-                self.logger.error("Can't connect to %s: %s" % (url, exc))
-                raise ConnectionError("Failed to download data from %s" % url) from None
-            except (HTTPError, requests.exceptions.HTTPError) as e:
-                self.logger.warning("HTTP error for %s: %s" % (url, e))
-                # Regretfully, in case of HTTP Error 429: Too Many Requests,
-                # e.headers does not contain a "Retry-after" header on store.steampowered.com/api.
-                raise ConnectionError("Failed to download data from %s" % url) from None
+            with f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                if time.time() - mtime < ttl * 86400:
+                    # file exists and is recent
+                    if memoize:
+                        with self._lock:
+                            memo = self._decoded.get(file_path)
+                            if memo and memo[0] == mtime and memo[1] == decode_name:
+                                self._decoded.move_to_end(file_path)
+                            else:
+                                memo = None
+                        if memo:
+                            self.logger.debug("Fetching %s (already decoded)" % (cache_name))
+                            return memo[2]
+                    self.logger.debug("Fetching %s" % (cache_name))
+                    data = f.read()
+                    use_cache = True
+        tmp_path = None  # type: Optional[str]
+        charset = None  # type: Optional[str]
+        if not use_cache:
+            data, finalurl, tmp_path, charset = self._download(url, cookies, file_path)
+            _downloaded_data = True
+            charset = charset or codecs.lookup(encoding).name
         
         try:
+            if _downloaded_data and not binary_mode:
+                # Decode with the charset of the response, and translate newlines 
+                # like open() in text mode does for cached reads.
+                data = data.decode(charset).replace('\r\n', '\n').replace('\r', '\n')
             decoded_data = decode_func(data)
-        except ValueError as e:
+        except (ValueError, SyntaxError) as e:
+            # Do not cache the invalid download. XML parse errors are a SyntaxError.
+            self._discard(tmp_path)
             if len(data) == 0:
                 self.logger.error("Donwloaded 0 bytes from %s. Invalid %s" % (url, decode_name))
             if finalurl == url:
@@ -165,35 +293,268 @@ class CachedDownloader:
                         from None
         if _downloaded_data:
             try:
-                self.logger.debug("Write to %s" % (file_path))
-                if binary_mode:
-                    with file_path.open('wb') as f:
-                        f.write(data)
-                else:
-                    with file_path.open('w', encoding=encoding) as f:
+                if tmp_path is None:
+                    raise OSError("Download of %s was not stored in the cache" % (url))
+                if not binary_mode and charset != codecs.lookup(encoding).name:
+                    # Cache files are read with the given encoding, not with the charset of the response.
+                    with open(tmp_path, 'w', encoding=encoding) as f:
                         f.write(data)
+                self.logger.debug("Write to %s" % (file_path))
+                # Atomically replace the cache file with the download
+                os.replace(tmp_path, file_path)
+                mtime = os.stat(file_path).st_mtime
             except OSError as e:
+                self._discard(tmp_path)
                 self.logger.warning("%s" % (e))
                 # report and proceed (ignore missing cache)
+                memoize = False
+        if memoize:
+            with self._lock:
+                self._decoded[file_path] = (mtime, decode_name, decoded_data)
+                self._decoded.move_to_end(file_path)
+                while len(self._decoded) > self.max_decoded:
+                    self._decoded.popitem(last=False)
         return decoded_data
+
+    def get_cached_stream(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, 
+                cookies: dict={}) -> BinaryIO:
+        """Return a binary file object with the content of URL, read from the cache file. 
+        If the cache file is missing or too old, the URL is downloaded to the cache file first.
+        Unlike the get_cached_*() methods, the content is not decoded, so it is not verified.
+        If the caller finds that the content is invalid, it should call discard_cache().
+        The caller must close the file.
+        The ttl is time-to-live of the cache file in days."""
+        if not cache_name:
+            cache_name = self._url_to_short_filename(url)
+        file_path = self._cache_path(cache_name)
+        try:
+            # Buffered, unlike _open_cache_file(), since the caller reads in small pieces.
+            f = open(file_path, 'rb')
+        except FileNotFoundError:
+            pass
+        else:
+            if time.time() - os.fstat(f.fileno()).st_mtime < ttl * 86400:
+                self.logger.debug("Fetching %s" % (cache_name))
+                return f
+            f.close()
+        data, finalurl, tmp_path, _ = self._download(url, cookies, file_path)
+        try:
+            if tmp_path is None:
+                raise OSError("Download of %s was not stored in the cache" % (url))
+            self.logger.debug("Write to %s" % (file_path))
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            self._discard(tmp_path)
+            self.logger.warning("%s" % (e))
+            # report and proceed (ignore missing cache)
+            return io.BytesIO(data)
+        return open(file_path, 'rb')
+
+    def get_cached_derived(self, cache_name: str, ttl: float, derive_func: Callable[[], Any]) -> Any:
+        """Return derive_func(), which should build a Python object from the 
+        cache file cache_name, e.g. by calling get_cached_stream(). 
+        If msgpack is available, the result is stored next to the cache file, and 
+        returned on later calls as long as the cache file is recent and unmodified. 
+        The object must be serializable by msgpack (dicts may have int keys).
+        The ttl is time-to-live of the cache file in days."""
+        if msgpack is None:
+            return derive_func()
+        file_path = self._cache_path(cache_name)
+        packed_path = file_path + '.msgpack'
+        try:
+            mtime = os.stat(file_path).st_mtime
+            if time.time() - mtime < ttl * 86400:
+                with open(packed_path, 'rb') as f:
+                    source_mtime, obj = msgpack.unpackb(f.read(), strict_map_key=False)
+                if source_mtime == mtime:
+                    self.logger.debug("Fetching %s (already decoded)" % (cache_name))
+                    return obj
+        except (OSError, ValueError, TypeError, msgpack.UnpackException):
+            pass
+        obj = derive_func()
+        tmp_path = None
+        try:
+            mtime = os.stat(file_path).st_mtime
+            fd, tmp_path = self._mkstemp(packed_path)
+            try:
+                self._write_all(fd, msgpack.packb((mtime, obj), use_bin_type=True))
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, packed_path)
+        except OSError as e:
+            self._discard(tmp_path)
+            self.logger.warning("%s" % (e))
+            # report and proceed (ignore missing cache)
+        return obj
+
+    def discard_cache(self, cache_name: str) -> None:
+        """Remove the cache file, e.g. because its content is invalid, 
+        so that the URL is downloaded again by the next call."""
+        file_path = self._cache_path(cache_name)
+        with self._lock:
+            self._decoded.pop(file_path, None)
+        self._discard(file_path)
+
+    def _cache_path(self, cache_name: str) -> str:
+        """Return the path of the cache file, and make sure its folder exists."""
+        # Use plain str paths and os functions, which avoid the overhead of Path objects.
+        file_path = os.path.join(str(self.cachefolder), cache_name)
+        folder = os.path.dirname(file_path)
+        if folder not in self._known_dirs:
+            os.makedirs(folder, exist_ok=True)
+            self._known_dirs.add(folder)
+        return file_path
+
+    @staticmethod
+    def _open_cache_file(path: str, binary_mode: bool, encoding: str):
+        """Open a (cache) file for reading."""
+        if binary_mode:
+            # Unbuffered: read() is FileIO.readall(), which sizes its buffer
+            # with fstat and reads straight into the resulting bytes object.
+            return open(path, 'rb', buffering=0)
+        else:
+            return open(path, 'r', encoding=encoding)
+
+    @staticmethod
+    def _discard(path: Optional[str]) -> None:
+        """Remove a (temporary) file, if it exists."""
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _mkstemp(path: str) -> Tuple[int, str]:
+        """Create a temporary file next to path, with the permissions of other new files.
+        Return the file descriptor and the path of the temporary file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), 
+                prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        except OSError:
+            pass  # keep the more restrictive permissions
+        return fd, tmp_path
+
+    def _download(self, url: URL, cookies: dict, 
+                file_path: str) -> Tuple[bytes, URL, Optional[str], Optional[str]]:
+        """Download the URL, and stream the response to a temporary file next to file_path,
+        rather than keeping the whole response in memory.
+        Return the tuple (data, final URL, path of the temporary file, charset).
+        The path is None if the temporary file could not be written.
+        The charset is None if the response does not specify a known charset."""
+        hostname = urlparse(url).hostname
+        tmp_path = None
+        try:
+            try:
+                with self._get_response(url, cookies, hostname) as r:
+                    finalurl = r.url
+                    if finalurl != url:
+                        self.logger.info("%s redirects to %s." % (url, finalurl))
+                    r.raise_for_status()
+                    try:
+                        charset = codecs.lookup(r.encoding).name if r.encoding else None
+                    except LookupError:
+                        charset = None
+                    chunks = r.iter_content(chunk_size=64*1024)
+                    try:
+                        fd, tmp_path = self._mkstemp(file_path)
+                    except OSError as e:
+                        self.logger.warning("%s" % (e))
+                        # report and proceed (ignore missing cache)
+                        return b''.join(chunks), finalurl, None, charset
+                    # Write the raw bytes with os.write(), and keep them to decode
+                    # the result, instead of reading the file back afterwards.
+                    parts = []
+                    try:
+                        for chunk in chunks:
+                            parts.append(chunk)
+                            self._write_all(fd, chunk)
+                    finally:
+                        os.close(fd)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self.logger.error("Can't connect to %s: %s" % (url, exc))
+                raise ConnectionError("Failed to download data from %s" % url) from None
+            except (HTTPError, requests.exceptions.HTTPError) as e:
+                self.logger.warning("HTTP error for %s: %s" % (url, e))
+                # Regretfully, in case of HTTP Error 429: Too Many Requests,
+                # e.headers does not contain a "Retry-after" header on store.steampowered.com/api.
+                # If it is there, hold off all further requests to this host.
+                retry_after = e.response.headers.get('Retry-After', '') \
+                        if getattr(e, 'response', None) is not None else ''
+                if retry_after.isdigit():
+                    self._drain_bucket(hostname, float(retry_after))
+                raise ConnectionError("Failed to download data from %s" % url) from None
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        return b''.join(parts), finalurl, tmp_path, charset
+    
+    def _get_response(self, url: URL, cookies: dict, hostname: str) -> requests.Response:
+        """Request the URL, and return the (streamed) response. Temporary server errors 
+        are retried. Each attempt waits for a token from the bucket of the host."""
+        attempt = 0
+        while True:
+            delay = self._take_token(hostname)
+            self.logger.debug("Fetching %s (after %.1fs delay)" % (url, delay))
+            r = self.session.get(url, cookies=cookies, stream=True, timeout=30)
+            if r.status_code not in _RETRY_STATUS or attempt >= _MAX_RETRIES:
+                return r
+            r.close()
+            # Steam does not send a Retry-After header with HTTP Error 429: Too Many Requests.
+            retry_after = r.headers.get('Retry-After', '')
+            wait = float(retry_after) if retry_after.isdigit() else _RETRY_BACKOFF * 2 ** attempt
+            self.logger.info("HTTP status %d for %s. Retry in %.1fs." % (r.status_code, url, wait))
+            if self.rate:
+                self._drain_bucket(hostname, wait)
+            else:
+                time.sleep(wait)
+            attempt += 1
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> None:
+        """Write all data to the file descriptor. os.write() may do a partial write."""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
     
     def get_cached_html(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={}):
         """Return a BeautifulSoup (parsed html) object from URL or cache file.
         The ttl is time-to-live of the cache file in days."""
+        if BeautifulSoup is None:
+            raise ImportError("Package beautifulsoup4 is not available. Install using e.g. "
+                    "`port install py-beautifulsoup4` or `pip install beautifulsoup4`.")
         return self.get_cached_url(url, cache_name, ttl=ttl, may_extend_cache=may_extend_cache, cookies=cookies, 
-                        decode_func=BeautifulSoup, decode_name='html', binary_mode=False)
+                        decode_func=_parse_html, decode_name='html', binary_mode=False)
 
-    def get_cached_json(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={}):
+    def get_cached_json(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={},
+                memoize: bool=False):
         """Return a Python object from URL or cache file.
-        The ttl is time-to-live of the cache file in days."""
+        The ttl is time-to-live of the cache file in days.
+        If memoize is True, later calls may return the same object, so it must not be modified."""
         return self.get_cached_url(url, cache_name, ttl=ttl, may_extend_cache=may_extend_cache, cookies=cookies, 
-                        decode_func=json.loads, decode_name='JSON', binary_mode=False)
+                        decode_func=_json_loads, decode_name='JSON', binary_mode=True, memoize=memoize)
 
-    def get_cached_xml(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={}):
+    def get_cached_json_simd(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={},
+                memoize: bool=False):
+        """Return a lazy simdjson document from URL or cache file, or a Python object 
+        (like get_cached_json) if simdjson is not available. 
+        Objects and arrays of the document can be read like dicts and lists.
+        The ttl is time-to-live of the cache file in days.
+        If memoize is True, later calls may return the same object, so it must not be modified."""
+        if simdjson is None:
+            return self.get_cached_json(url, cache_name, ttl=ttl, may_extend_cache=may_extend_cache, cookies=cookies,
+                        memoize=memoize)
+        return self.get_cached_url(url, cache_name, ttl=ttl, may_extend_cache=may_extend_cache, cookies=cookies, 
+                        decode_func=_simdjson_parse, decode_name='simdjson', binary_mode=True, memoize=memoize)
+
+    def get_cached_xml(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={},
+                memoize: bool=False):
         """Return a Python object from URL or cache file.
-        The ttl is time-to-live of the cache file in days."""
+        The ttl is time-to-live of the cache file in days.
+        If memoize is True, later calls may return the same object, so it must not be modified."""
         return self.get_cached_url(url, cache_name, ttl=ttl, may_extend_cache=may_extend_cache, cookies=cookies, 
-                        decode_func=ElementTree.fromstring, decode_name='XML', binary_mode=False)
+                        decode_func=_xml_fromstring, decode_name='XML', binary_mode=True, memoize=memoize)
 
     def get_cached_binary(self, url: URL, cache_name: str=None, ttl: float=1.2, may_extend_cache: bool=False, cookies: dict={}):
         """Return a Python object from URL or cache file.
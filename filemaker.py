@@ -8,15 +8,16 @@ port install py-pyodbc  (also installs unixODBC)
 install Filemaker ODBC, can be downloaded from http://www.filemaker.com/support/downloads/
 """
 from os.path import exists
+from collections import OrderedDict
 import logging
 
 # Type hints
 try:
-    from typing import Dict, Any, Callable, Union, Tuple, Optional, Iterator
+    from typing import Dict, Any, Callable, Union, Tuple, Optional, Iterator, Iterable, List
     STR_OR_DICT = Union[str, Dict[str, Union[str, None]]]
 except ImportError:
     from collections import defaultdict
-    Dict = Union = Optional = Tuple = Iterator = defaultdict(str)  # type: ignore
+    Dict = Union = Optional = Tuple = Iterator = Iterable = List = defaultdict(str)  # type: ignore
     Any = Callable = STR_OR_DICT = ''  # type: ignore
 
 # third party packages
@@ -41,6 +42,11 @@ class FileMaker:
         self.server_ip = '127.0.0.1'
         self.server_port = 2399
         self._connection = None  # type: Optional[pyodbc.Connection]
+        # Cursors for UPDATE queries. pyodbc only prepares a statement again
+        # if a cursor executes a different query than the previous time.
+        self._cursors = {}  # type: Dict[str, pyodbc.Cursor]
+        # Send all sets of arguments of an executemany() at once, until the driver rejects it.
+        self._fast_executemany = True
         self._precommit_hook1 = None  # type: Optional[Callable]
         self._precommit_hook1_called = False
 
@@ -77,6 +83,9 @@ class FileMaker:
         # self._connection.setdecoding(pyodbc.SQL_WMETADATA, encoding='utf-32le')
     
     def close(self) -> None:
+        for cursor in self._cursors.values():
+            cursor.close()
+        self._cursors = {}
         if self._connection:
             logging.debug("Close database connection")
             self._connection.close()
@@ -101,29 +110,37 @@ class FileMaker:
             logging.error("FileMaker.commit() called before connection was established.")
     
     def select(self, fields: Tuple[str, ...], tablename: str, where: STR_OR_DICT={}, 
-                order: Optional[str]=None) -> Iterator[Dict[str, str]]:
+                order: Optional[str]=None, row_format: str='dict', distinct: bool=False,
+                chunk_size: int=500, wherevalues: Tuple=()) -> Iterator[Any]:
         """Yield all selected records in the given table.
         
         :param tuple fields: A tuple with the fieldnames to return.
         :param str tablename: name of the table.
         :param str or dict where: (optional) selection of the fields.
         :param str order: (optional) field to return.
-        :return: Yield a dict with fieldname: value for each record.
+        :param str row_format: (optional) 'dict' or 'tuple'.
+        :param bool distinct: (optional) if True, only return unique records.
+        :param int chunk_size: (optional) number of records to fetch at once.
+        :param tuple wherevalues: (optional) values for the ? parameters in a where string.
+        :return: Yield a dict with fieldname: value for each record,
+                 or a tuple with the values in the order of fields.
         """
+        if row_format not in ('dict', 'tuple'):
+            raise ValueError("Unknown row_format %r" % (row_format))
         if not self._connection:
             self.connect()
-        wherevalues = ()  # type: Tuple[str, ...]
         if isinstance(where, dict):
             wherevalues = tuple(v for v in where.values() if v)
             where = ' AND '.join(k + ('=?' if v else 'IS NULL') for k, v in where.items())
         cursor = self._connection.cursor()
         queryparts = {
+            'distinct': 'DISTINCT ' if distinct else '',
             'fields': ','.join(fields),
             'tablename': tablename,
             'where': 'WHERE ' + where if where else '',
             'order': 'ORDER BY ' + order if order else '',
         }
-        query = "SELECT {fields} FROM {tablename} {where} {order}".format(**queryparts)
+        query = "SELECT {distinct}{fields} FROM {tablename} {where} {order}".format(**queryparts)
         logging.debug('%s%s' % (query, ' with ' + str(wherevalues) if wherevalues else ''))
         try:
             cursor.execute(query, *wherevalues)
@@ -132,27 +149,35 @@ class FileMaker:
             logging.error(str(e))
             raise
         # support "abc AS def" or "FUNCTION(abc) AS def" syntax
-        fields = [field.split(' AS ')[-1] for field in fields]
+        fields = tuple(field.split(' AS ')[-1] for field in fields)
+        # Fetch records in batches, rather than one ODBC call per record.
+        # This generator may run concurrently with other queries, so it uses its own cursor.
+        cursor.arraysize = chunk_size
         while True:
-            record = cursor.fetchone()
-            if record is None:
+            records = cursor.fetchmany()
+            if not records:
                 break
-            record = dict(zip(fields, record))
-            yield record
+            if row_format == 'tuple':
+                # pyodbc.Row supports indexing and unpacking like a tuple
+                yield from records
+            else:
+                for record in records:
+                    yield dict(zip(fields, record))
         cursor.close()
 
-    def update(self, tablename: str, where: STR_OR_DICT, update: STR_OR_DICT) -> int:
-        """Update the selected records in the given table.
-        You must call commit() before the database is actually changed.
-        
-        :param str tablename: name of the table.
-        :param str or dict where: selection of the records to update.
-        :param str or dict update: fields and values to change.
-        :return: The number of modified records (if available)
-        """
-        if not self._connection:
-            self.connect()
-        self.call_precommit_hooks()
+    def _cursor(self, query: str) -> pyodbc.Cursor:
+        """Return the cursor for the given query, with the query prepared 
+        if it was executed before."""
+        try:
+            return self._cursors[query]
+        except KeyError:
+            cursor = self._connection.cursor()
+            self._cursors[query] = cursor
+            return cursor
+
+    @staticmethod
+    def _update_query(tablename: str, where: STR_OR_DICT, update: STR_OR_DICT) -> Tuple[str, Tuple]:
+        """Return the UPDATE query and the values of its parameters."""
         wherevalues = ()
         if isinstance(where, dict):
             wherevalues = tuple(v for v in where.values() if v)  # type: ignore
@@ -161,26 +186,86 @@ class FileMaker:
             wherevalues = tuple(update.values()) + wherevalues  # type: ignore
             update = ', '.join((k + '=?') for k in update.keys())
         
-        cursor = self._connection.cursor()
         queryparts = {
             'tablename': tablename,
             'where': where,
             'update': update,
         }
         query = "UPDATE {tablename} SET {update} WHERE {where}".format(**queryparts)
+        return query, wherevalues
+
+    @staticmethod
+    def _log_execute_error(query: str, wherevalues: Tuple, e: pyodbc.Error) -> None:
+        if wherevalues:
+            query += ' with %d arguments: (%s)' % \
+                    (len(wherevalues), ', '.join(type(v).__name__ for v in wherevalues))
+        logging.error(query)
+        logging.error('%s %s' % (type(e).__name__, str(e.args[1])))
+
+    def update(self, tablename: str, where: STR_OR_DICT, update: STR_OR_DICT) -> int:
+        """Update the selected records in the given table.
+        You must call commit() before the database is actually changed.
+        
+        :param str tablename: name of the table.
+        :param str or dict where: selection of the records to update.
+        :param str or dict update: fields and values to change.
+        :return: The number of modified records (if available)
+        """
+        if not self._connection:
+            self.connect()
+        self.call_precommit_hooks()
+        query, wherevalues = self._update_query(tablename, where, update)
         logging.debug('%s%s' % (query, ' with ' + str(wherevalues) if wherevalues else ''))
         if not where:
             logging.error("Update without a where is not supported. It would modify all records.")
             return 0
+        cursor = self._cursor(query)
         try:
-            cursor.execute(query, *wherevalues)
+            cursor.execute(query, wherevalues)
         except pyodbc.Error as e:
-            if wherevalues:
-                query += ' with %d arguments: (%s)' % \
-                        (len(wherevalues), ', '.join(type(v).__name__ for v in wherevalues))
-            logging.error(query)
-            logging.error('%s %s' % (type(e).__name__, str(e.args[1])))
+            self._log_execute_error(query, wherevalues, e)
             raise
-        rowcount = cursor.rowcount
-        cursor.close()
-        return rowcount
+        return cursor.rowcount
+
+    def update_many(self, tablename: str, rows: Iterable[Tuple[STR_OR_DICT, STR_OR_DICT]]) -> None:
+        """Update the selected records in the given table, for each (where, update) pair in rows.
+        Pairs with the same fields are sent to the database with a single executemany().
+        You must call commit() before the database is actually changed.
+        The number of modified records is not available after executemany().
+        
+        :param str tablename: name of the table.
+        :param iterable rows: (where, update) pairs, as for update().
+        """
+        if not self._connection:
+            self.connect()
+        self.call_precommit_hooks()
+        queries = OrderedDict()  # type: OrderedDict[str, List[Tuple]]
+        for where, update in rows:
+            if not where:
+                logging.error("Update without a where is not supported. It would modify all records.")
+                continue
+            query, wherevalues = self._update_query(tablename, where, update)
+            queries.setdefault(query, []).append(wherevalues)
+        for query, params in queries.items():
+            logging.debug('%s with %d sets of arguments' % (query, len(params)))
+            cursor = self._cursor(query)
+            # fast_executemany requires pyodbc 4.0.19 or later.
+            fast = self._fast_executemany and hasattr(cursor, 'fast_executemany')
+            if fast:
+                cursor.fast_executemany = True
+            try:
+                cursor.executemany(query, params)
+            except pyodbc.Error as e:
+                if not fast:
+                    self._log_execute_error(query, params[0], e)
+                    raise
+                # Not all ODBC drivers support arrays of parameters. The updates only
+                # set values, so it is safe to send them again, one set at a time.
+                logging.info("executemany() with fast_executemany failed: %s. Retry without it." % (e))
+                self._fast_executemany = False
+                cursor.fast_executemany = False
+                try:
+                    cursor.executemany(query, params)
+                except pyodbc.Error as e:
+                    self._log_execute_error(query, params[0], e)
+                    raise
@@ -3,13 +3,14 @@
 """Interface to Humble Bundle"""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Type hints
 try:
-    from typing import Dict, List, Any
+    from typing import Dict, List, Any, Iterable, Iterator
 except ImportError:
     from collections import defaultdict
-    Dict = List = defaultdict(str)  # type: ignore
+    Dict = List = Iterable = Iterator = defaultdict(str)  # type: ignore
     Any = ''  # type: ignore
 
 # local module (only used here for type hints)
@@ -23,6 +24,7 @@ class HumbleBundle:
     def __init__(self, sessioncookie, downloader: CachedDownloader) -> None:
         # self.cookies = {'_simpleauth_sess': sessioncookie}
         self.downloader = downloader
+        self._order_info_cache = {}  # type: Dict[str, Dict[str, Any]]
         self.downloader.add_cookie('_simpleauth_sess', sessioncookie, 'humblebundle.com', '/')
 
     # def get_game_data(self, slug):
@@ -36,8 +38,9 @@ class HumbleBundle:
         The current user is determined by the sessioncookie.
         May raise an PermissionError if the sessioncookie is invalid."""
         try:
+            # Several actions read the list; it is only read, so it can be shared.
             orderlist = self.downloader.get_cached_json(
-                    self.ORDER_LIST_URL, 'humble_orders_list.json')
+                    self.ORDER_LIST_URL, 'humble_orders_list.json', memoize=True)
         except PermissionError:
             logging.error("Permission denied for %s. Log in manually with your webbrowser, " \
                 "and store the _simpleauth_sess cookie in config.ini, in " \
@@ -53,7 +56,12 @@ class HumbleBundle:
         This can be detected with the difference between 'total' and len('subproducts')
         
         The current user is determined by the sessioncookie.
-        May raise an PermissionError if the sessioncookie is invalid."""
+        May raise an PermissionError if the sessioncookie is invalid.
+        The details are kept in memory, so each order is only looked up once."""
+        try:
+            return self._order_info_cache[orderid]
+        except KeyError:
+            pass
         try:
             orderdetails = self.downloader.get_cached_json(
                     self.ORDER_INFO_URL.format(order_id=orderid), 
@@ -63,8 +71,17 @@ class HumbleBundle:
                 "and store the _simpleauth_sess cookie in config.ini, in " \
                 "humblebundle_sessioncookie.")
             raise
+        self._order_info_cache[orderid] = orderdetails
         return orderdetails
 
+    def get_order_infos(self, orderids: Iterable[str], max_workers: int=8) -> Iterator[Dict[str, Any]]:
+        """Yield the details of the given orders, in the same order.
+        Orders which are not cached yet are downloaded concurrently, 
+        but still throttled by the downloader.
+        May raise an PermissionError if the sessioncookie is invalid."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(self.get_order_info, orderids)
+
     # def get_order_summary(self, orderid: str):
     #     """Return a summary of a given order."""
         
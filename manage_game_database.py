@@ -14,6 +14,7 @@ import argparse
 import difflib
 from pathlib import Path
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # external packages
 try:
@@ -22,6 +23,17 @@ except ImportError:
     raise ImportError("Package ConfigArgParse is not available. Install using e.g. "
             "`port install py-configargparse` or `pip install ConfigArgParse`.") from None
 
+# optional external package, for faster fuzzy name matching
+try:
+    from rapidfuzz import process as fuzzprocess, fuzz
+except ImportError:
+    fuzzprocess = None
+# optional external package, required for rapidfuzz.process.cdist
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # local modules
 from filemaker import FileMaker
 from downloader import CachedDownloader
@@ -30,52 +42,138 @@ from humblebundle import HumbleBundle
 
 # Type hints
 try:
-    from typing import Dict, List, TextIO, Union, Any, Container
+    from typing import Dict, List, Set, Tuple, TextIO, Union, Any, Container, Optional, Iterator, Iterable
 except ImportError:
     # backward compatible with Python 3.4
     from collections import defaultdict
-    List = Dict = Union = defaultdict(str)  # type: ignore
+    List = Dict = Set = Tuple = Union = Optional = Iterator = Iterable = defaultdict(str)  # type: ignore
     TextIO = Any = ''  # type: ignore
 URL = str
+Date = date  # (date is also used as variable name)
+
+# sequence of punctuation, whitespace or underscores, ignored when comparing names
+_NON_WORD_RE = re.compile(r'[\W_]+')
+# alternative name in the Note field of a purchase
+_KNOWN_AS_RE = re.compile(r'known as (.*?)(\.|$)', flags=re.IGNORECASE)
+# Steam store URLs of a bundle or package, or of multiple apps
+_STEAM_BUNDLE_RE = re.compile(r'store\.steampowered\.com/(bundle|sub)')
+_STEAM_APP2_RE = re.compile(r'(?:store\.steampowered\.com/app.*){2}')
+# separator between Humble Bundle order IDs in the HumbleOrder field
+_ORDER_SPLIT_RE = re.compile(r'\s*,\s*')
+
+# Let the database return Steam IDs as whole numbers. The ODBC driver may still
+# return them as Decimal or float, so the values are converted with int() anyway.
+_STEAM_APP_ID_FIELD = 'CAST(SteamAppId AS INTEGER) AS SteamAppId'
+
+# platforms of downloads in Humble Bundle orders
+_DESKTOP_PLATFORMS = frozenset(['mac', 'windows', 'linux'])
+_NON_DESKTOP_PLATFORMS = frozenset(['asmjs', 'android'])
+_NON_GAME_PLATFORMS = frozenset(['audio', 'video', 'ebook'])
+_KNOWN_PLATFORMS = _DESKTOP_PLATFORMS | _NON_DESKTOP_PLATFORMS | _NON_GAME_PLATFORMS
+
+
+class _LazyJoin:
+    """Join the items with ', ', but only when converted to a string.
+    Used as logging argument, so nothing is joined if the message is not logged."""
+    def __init__(self, items: Iterable[str]) -> None:
+        self.items = items
+
+    def __str__(self) -> str:
+        return ', '.join(self.items)
+
+
+def normalize_name(name: str) -> str:
+    """Return the name in lowercase, without punctuation and whitespace."""
+    return _NON_WORD_RE.sub('', name.casefold())
 
 
 def print_dict(data: Dict, keys: Container, ignore_keys: Container=(), indent=0, chain=[], output: TextIO=sys.stdout):
+    parts = []  # type: List[str]
+    _walk_dict(data, frozenset(keys), frozenset(ignore_keys), indent, chain, parts)
+    output.write(''.join(parts))
+
+def _walk_dict(data: Dict, keys: Container, ignore_keys: Container, indent: int, chain: List[str], 
+               parts: List[str]) -> None:
+    """Append the lines of print_dict() to parts."""
+    prefix = indent * '  '
     for key, value in data.items():
         if key in ignore_keys:
             continue
         elif isinstance(value, dict):
-            print_dict(value, keys, ignore_keys, indent + 1, chain + [key], output)
+            _walk_dict(value, keys, ignore_keys, indent + 1, chain + [key], parts)
         elif isinstance(value, list):
             for no, item in enumerate(value):
                 if isinstance(item, dict):
-                    print_dict(item, keys, ignore_keys, indent + 1, chain + [key, str(no)], output)
+                    _walk_dict(item, keys, ignore_keys, indent + 1, chain + [key, str(no)], parts)
         elif key in keys:
             if value:
                 keyname = '.'.join(chain + [key])
-                output.write(indent * '  ' + keyname + ': ' + str(value).strip() + '\n')
+                parts.append(prefix + keyname + ': ' + str(value).strip() + '\n')
 
-def find_possible_matches(*names: str, name_values: Dict[str, List[Any]], cutoff: float=0.8) -> List[Any]:
+def find_possible_matches(*names: str, name_values: Dict[str, List[Any]], cutoff: float=0.8,
+                          choices: List[str]=None, normalized_values: Dict[str, List[Any]]=None) -> List[Any]:
     """Find the most likely steam IDs, give a list of possible names. 
+    choices is an (optional) list of the keys of name_values, so it is not rebuilt every call.
+    normalized_values is an (optional) dict with the values by normalize_name() of the keys.
+    It is used to match names which only differ in case or punctuation, without fuzzy matching.
     Returns a list with possible ids."""
     for name in names:
         if name in name_values:
-            logging.debug("Exact Match %s -> %s -> %s" % (names[0], name, name_values[name]))
+            logging.debug("Exact Match %s -> %s -> %s", names[0], name, name_values[name])
             return name_values[name]
+    if normalized_values and cutoff < 1.0:
+        for name in names:
+            normalized = normalize_name(name)
+            if normalized and normalized in normalized_values:
+                logging.debug("Normalized Match %s -> %s -> %s",
+                        names[0], name, normalized_values[normalized])
+                return normalized_values[normalized]
+    if cutoff >= 1.0:
+        # only an exact match has a ratio of 1.0
+        logging.debug("No Match %s -> None", names[0])
+        return []
+    if choices is None:
+        choices = list(name_values)
+    # skip names which only differ in case or punctuation from another name
+    queries = []  # type: List[str]
+    tried = set()  # type: Set[str]
     for name in names:
-        # ignore type hints of difflib.get_close_matches [https://github.com/python/typeshed#2063]
-        matches = []  # type: List[str]
-        matches = difflib.get_close_matches(name,  # type: ignore
-                            name_values, n=100, cutoff=cutoff)
+        normalized = normalize_name(name)
+        if normalized not in tried:
+            tried.add(normalized)
+            queries.append(name)
+    for matches in _close_matches(queries, choices, cutoff, limit=20):
         if matches:
             options = []
             for match in matches:  # type: str
                 # logging.debug("Fuzzy Match %s -> %s -> %s" % (name, match, name_values[match]))
                 options.extend(name_values[match])
-            logging.debug("Fuzzy Match %s -> %s -> %s" % (names[0], matches, options))
+            logging.debug("Fuzzy Match %s -> %s -> %s", names[0], matches, options)
             return options
-    logging.debug("No Match %s -> None" % (names[0]))
+    logging.debug("No Match %s -> None", names[0])
     return []
 
+def _close_matches(queries: List[str], choices: List[str], cutoff: float, limit: int) -> Iterator[List[str]]:
+    """For each query, yield a list with the best matching choices, best match first."""
+    if fuzzprocess is not None and numpy is not None:
+        # Score all queries at once. Scores below the cutoff are set to 0.
+        # fuzz.ratio is similar to the difflib ratio (times 100), but much faster.
+        scores = fuzzprocess.cdist(queries, choices, scorer=fuzz.ratio,
+                                   score_cutoff=cutoff * 100, workers=-1)
+        for row in scores:
+            indices = row.nonzero()[0]
+            indices = indices[numpy.argsort(-row[indices], kind='stable')][:limit]
+            yield [choices[i] for i in indices]
+    elif fuzzprocess is not None:
+        for query in queries:
+            # fuzz.ratio is similar to the difflib ratio (times 100), but much faster.
+            yield [match for match, score, index in fuzzprocess.extract(query, choices,
+                            scorer=fuzz.ratio, limit=limit, score_cutoff=cutoff * 100)]
+    else:
+        for query in queries:
+            # ignore type hints of difflib.get_close_matches [https://github.com/python/typeshed#2063]
+            yield difflib.get_close_matches(query, choices, n=limit, cutoff=cutoff)  # type: ignore
+
 def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dry_run=False, strict_name_check=False) -> None:
     """Look for all records where the distributor is Steam, but without a Steam ID.
     Try to find these games"""
@@ -87,7 +185,10 @@ def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dr
             steamnames_id[v].extend([k])
         except KeyError:
             steamnames_id[v] = [k]
-    # steamnames = steamnames_id.keys()
+    steamnames = list(steamnames_id)
+    steamnames_normalized_id = defaultdict(list)  # type: Dict[str, List[int]]
+    for k, v in steamnames_id.items():
+        steamnames_normalized_id[normalize_name(k)].extend(v)
     logging.info("Query database for Purchases with missing SteamAppID")
     
     fields = ('Name', 'Parent', 'AppType', 'GameIdentifier', 'SteamAppId', 'Note')
@@ -97,7 +198,13 @@ def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dr
     changecount = 0
     gamecount = 0
     cutoff = 1.0 if strict_name_check else 0.8
-    for record in database.select(fields, 'Purchases', where):
+    # (where, update) pairs, sent to the database in batches
+    pending_updates = []  # type: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    # First find the possible IDs for all records, so that the Steam data
+    # of all candidates can be fetched at once, rather than one by one.
+    candidates = []  # type: List[Tuple[Dict[str, Any], List[int]]]
+    candidate_ids = set()  # type: Set[int]
+    for record in database.select(fields, 'Purchases', where, order='Name'):
         gamecount += 1
         name = record['Name']
         alias = record['GameIdentifier']
@@ -105,34 +212,44 @@ def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dr
         if alias and alias != name:
             names.append(alias)
         if record['Note']:
-            m = re.search(r'known as (.*?)(\.|$)', record['Note'], flags=re.IGNORECASE)
+            m = _KNOWN_AS_RE.search(record['Note'])
             if m:
                 names.append(m.group(1))
         possible_ids = find_possible_matches(*names, 
-                name_values=steamnames_id, cutoff=cutoff)  # type: List[int]
-        # Check if the found IDs are valid
-        possible_ids_copy = possible_ids[:]
+                name_values=steamnames_id, cutoff=cutoff, choices=steamnames,
+                normalized_values=steamnames_normalized_id)  # type: List[int]
+        candidates.append((record, possible_ids))
+        candidate_ids.update(possible_ids)
+    appdata = steam.get_appdata_many(candidate_ids)
+    for record, possible_ids in candidates:
+        name = record['Name']
+        alias = record['GameIdentifier']
+        # Check if the found IDs are valid, and replace them by their master ID
+        resolved = []  # type: List[int]
+        seen = set()  # type: Set[int]
         non_steam_ids = []
-        for appid in possible_ids_copy:
+        for appid in possible_ids:
             try:
-                steamdata = steam.get_appdata(appid)
+                steamdata = appdata[appid]
                 masterid = steamdata["steam_appid"]
                 if steamdata["type"] == "demo":
-                    logging.debug("Remove Steam ID %s for demo game" % (masterid))
+                    logging.debug("Remove Steam ID %s for demo game", masterid)
                     masterid = None
             except KeyError:
                 masterid = None
+            if masterid is None:
+                non_steam_ids.append(appid)
+                continue
             if masterid != appid:
-                possible_ids.remove(appid)
-                if masterid is None:
-                    non_steam_ids.append(appid)
-                elif masterid not in possible_ids:
-                    logging.debug("Replace Steam ID %s with %s" % (appid, masterid))
-                    possible_ids.append(masterid)
-            if non_steam_ids and not possible_ids:
-                # All that is left are steam IDs without further information
-                logging.warning("No information found for %s (IDs %s)" % (name, non_steam_ids))
-                # possible_ids = non_steam_ids
+                logging.debug("Replace Steam ID %s with %s", appid, masterid)
+            if masterid not in seen:
+                seen.add(masterid)
+                resolved.append(masterid)
+        possible_ids = resolved
+        if non_steam_ids and not possible_ids:
+            # All that is left are steam IDs without further information
+            logging.warning("No information found for %s (IDs %s)" % (name, non_steam_ids))
+            # possible_ids = non_steam_ids
         if not possible_ids:
             print("No steam ID found for %s / %s" % (name, alias))
         elif len(possible_ids) > 1:
@@ -146,7 +263,7 @@ def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dr
             found_name = ''
             found_date = ''
             try:
-                j = steam.get_appdata(steamid)
+                j = appdata[steamid] if steamid in appdata else steam.get_appdata(steamid)
                 found_name = j['name']
                 found_date = j['release_date']['date']
             except KeyError:
@@ -162,15 +279,19 @@ def find_missing_steamids(steam: Steam, database: FileMaker, all_games=False, dr
             }
             update = {'SteamAppId': steamid}
             if not dry_run:
-                rowcount = database.update('Purchases', uwhere, update)
-                if rowcount != 1:
-                    logging.info("Updated (but not committed) %s records" % (rowcount))
-                changecount += rowcount
+                pending_updates.append((uwhere, update))
+                if len(pending_updates) >= 100:
+                    database.update_many('Purchases', pending_updates)
+                    changecount += len(pending_updates)
+                    pending_updates = []
         else:
             # all possible cases of len(possible_ids) should be caught (0, 1, >1)
             raise AssertionError("len(possible_ids) = %s" % (len(possible_ids)))
         # if changecount > 500:
         #     break
+    if pending_updates:
+        database.update_many('Purchases', pending_updates)
+        changecount += len(pending_updates)
     logging.info("Found %s games without Steam App ID" % (gamecount))
     if gamecount > 0:
         logging.info("Made %s updates to the database" % (changecount))
@@ -188,53 +309,59 @@ def add_steam_images(cachedownload: CachedDownloader, database: FileMaker):
     
     logging.info("Query database for Purchases")
     # fields = ('Name', 'AppType', 'SteamAppId', "GetAs(Image, 'JPEG') AS Image")
-    fields = ('SteamAppId', )
+    fields = (_STEAM_APP_ID_FIELD, )
     where = 'SteamAppId IS NOT NULL AND Image IS NULL'
-    games = database.select(fields, 'Purchases', where)
-    steamids = [int(record['SteamAppId']) for record in games]  # type: List[int]
-    
-    totalcount = len(steamids)
-    steamids = list(set(steamids))  # remove duplicates
-    logging.info("Found %d Games with %d missing image" % (totalcount, len(steamids)))
+    # let the database remove duplicates
+    steamids = [int(record[0]) for record in 
+                database.select(fields, 'Purchases', where, row_format='tuple', distinct=True)]  # type: List[int]
+    logging.info("Found %d Steam IDs with missing image" % (len(steamids)))
     
-    updatecount = 0
-    downloadcount = 0
-    exception_count = 0
-    skip_updates = False
-    for steamid in steamids:
+    def download_image(steamid: int) -> Optional[bytes]:
         image_url = IMAGE_URL.format(SteamAppId=steamid)
         image_path = IMAGE_PATH.format(SteamAppId=steamid)
         try:
-            image = cachedownload.get_cached_binary(image_url, image_path, ttl=100)
+            return cachedownload.get_cached_binary(image_url, image_path, ttl=100)
         except ConnectionError as e:
             logging.error(str(e))
-            continue
-        
-        # TODO: remove loosy images, so they are not imported in the database
-        
-        if len(image) < 4000:
-            logging.warning("Poor image %s: only %d bytes" % (image_path, len(image)))
-            continue
-        downloadcount += 1
-        uwhere = {
-            'Image': None,
-            'SteamAppId': steamid
-        }
-        update = {"PutAs(Image, 'JPEG')": image}
-        print("Found Image for Steam ID %d: %s" % (steamid, image_url))
-        if not skip_updates:
-            try:
-                rowcount = database.update('Games', uwhere, update)
-                if rowcount != 1:
-                    logging.info("Updated (but not committed) %s records" % (rowcount))
-                updatecount += rowcount
-            except Exception:
-                exception_count += 1
-                if exception_count > 2:
-                    logging.error("Updating containers fails repeatedly. "
-                            "This may be a limitation with FileMaker and ODBC. "
-                            "Skipping further updates (only downloading images).")
-                    skip_updates = True
+            return None
+    
+    updatecount = 0
+    downloadcount = 0
+    exception_count = 0
+    skip_updates = False
+    # Download the images concurrently, but update the database one by one.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for steamid, image in zip(steamids, executor.map(download_image, steamids)):
+            if image is None:
+                continue
+            image_url = IMAGE_URL.format(SteamAppId=steamid)
+            image_path = IMAGE_PATH.format(SteamAppId=steamid)
+            
+            # TODO: remove loosy images, so they are not imported in the database
+            
+            if len(image) < 4000:
+                logging.warning("Poor image %s: only %d bytes" % (image_path, len(image)))
+                continue
+            downloadcount += 1
+            uwhere = {
+                'Image': None,
+                'SteamAppId': steamid
+            }
+            update = {"PutAs(Image, 'JPEG')": image}
+            print("Found Image for Steam ID %d: %s" % (steamid, image_url))
+            if not skip_updates:
+                try:
+                    rowcount = database.update('Games', uwhere, update)
+                    if rowcount != 1:
+                        logging.info("Updated (but not committed) %s records" % (rowcount))
+                    updatecount += rowcount
+                except Exception:
+                    exception_count += 1
+                    if exception_count > 2:
+                        logging.error("Updating containers fails repeatedly. "
+                                "This may be a limitation with FileMaker and ODBC. "
+                                "Skipping further updates (only downloading images).")
+                        skip_updates = True
     logging.info("Updated %d games without Image" % (updatecount))
     logging.info("Downloaded %d Images" % (downloadcount))
     if updatecount > 0 and not skip_updates:
@@ -244,6 +371,10 @@ def add_steam_images(cachedownload: CachedDownloader, database: FileMaker):
         print("Please manually update images from FileMaker. Use the following script:")
         print("To be written")  # TODO
 
+def _is_steam_distrib(distribution: Optional[str]) -> bool:
+    """Return True if the Distribution field of a purchase mentions Steam."""
+    return bool(distribution) and 'steam' in distribution.casefold()
+
 def verify_steamids(steam: Steam, database: FileMaker):
     """Verify that the SteamIDs listed here are also present in my Steam account.
     If not, either the Steam ID is wrong, I decided to give them away, or I have 
@@ -264,62 +395,56 @@ def verify_steamids(steam: Steam, database: FileMaker):
                     (steamid, steamapps[steamid]['name']))
     
     logging.info("Query database for Purchases")
-    fields = ('Name', 'AppType', 'SteamAppId', 'Distribution', 'Gift', 'PriceType', 'StoreURL')
-    steamid_in_db = set()
+    fields = ('Name', 'AppType', _STEAM_APP_ID_FIELD, 'Distribution', 'Gift', 'PriceType', 'StoreURL')
+    records = list(database.select(fields, 'Purchases', row_format='tuple'))
+    steamid_in_db = {int(steamappid) for _, _, steamappid, _, _, _, _ in records if steamappid}
+    # Fetch the data of all Steam IDs in the database and in my Steam account concurrently.
+    appdata = steam.get_appdata_many(steamid_in_db.union(steamapps))
     # Loop through all steam IDs in the FileMaker database, 
     # and check if they are actually in steam.
-    for game in database.select(fields, 'Purchases'):
-        steamdistrib = bool(game['Distribution']) and ("steam" in game['Distribution'].lower())
-        isgift = game['Gift'] in ("Ungifted gift", "Given away")
-        if game['SteamAppId']:
-            steamid = int(game['SteamAppId'])
-            steamid_in_db.add(steamid)
+    for name, apptype, steamappid, distribution, gift, pricetype, storeurl in records:
+        steamdistrib = _is_steam_distrib(distribution)
+        isgift = gift in ("Ungifted gift", "Given away")
+        if steamappid:
+            steamid = int(steamappid)
         else:
             if steamdistrib:
-                if game['StoreURL'] is None or not ( \
-                        re.search(r'store\.steampowered\.com/(bundle|sub)', game['StoreURL']) or \
-                        re.search(r'(store\.steampowered\.com/app.*){2}', game['StoreURL'])):
+                if storeurl is None or not ( \
+                        _STEAM_BUNDLE_RE.search(storeurl) or \
+                        _STEAM_APP2_RE.search(storeurl)):
                     print("Game '%s': Steam distributed, no Steam ID, and no valid Store URL: %s" \
-                            % (game["Name"], game['StoreURL']))
+                            % (name, storeurl))
             continue 
-        try:
-            steamtype = steam.get_appdata(steamid)['type']
-        except KeyError:
-            steamtype = 'removed'
+        steamdata = appdata.get(steamid, {})
+        steamtype = steamdata.get('type', 'removed')
         
-        if steamtype not in ('game', 'dlc', 'removed') and game['AppType'] != 'Media':
+        if steamtype not in ('game', 'dlc', 'removed') and apptype != 'Media':
                 print("%s \'%s\' with Steam ID %s has type %s on Steam. " \
                         "Likely a wrong Steam ID." % \
-                        (game['AppType'], game["Name"], steamid, steamtype))
-        elif game['AppType'] == 'Game' and steamtype == 'dlc' and game['PriceType'] != 'Freemium':
+                        (apptype, name, steamid, steamtype))
+        elif apptype == 'Game' and steamtype == 'dlc' and pricetype != 'Freemium':
             print(("%s \'%s\' with Steam ID %s has type DLC on Steam, and is a non-Freemium " \
                     "game in the database. Is it a game or DLC?") % \
-                    (game['AppType'], game["Name"], steamid))
+                    (apptype, name, steamid))
             # Other way around: DLC in database and Game in Steam is most likely a case where
             # the database contains the ID of the parent Game (perhaps the DLC does not have 
             # it's own ID).
-        elif (game['AppType'] == 'Bundle' and steamtype == 'dlc') or \
-                (game['AppType'] == 'Media' and steamtype not in ('series',)) or \
-                game['AppType'] not in ('Game', 'DLC', 'Bundle', 'Media'):
+        elif (apptype == 'Bundle' and steamtype == 'dlc') or \
+                (apptype == 'Media' and steamtype not in ('series',)) or \
+                apptype not in ('Game', 'DLC', 'Bundle', 'Media'):
             print("%s \'%s\' with Steam ID %s has type %s on Steam. Is this correct?" % \
-                    (game['AppType'], game["Name"], steamid, steamtype))
+                    (apptype, name, steamid, steamtype))
         
         if steamdistrib and steamtype != 'removed' and not isgift and steamid not in steamapps \
                 and steamid not in steamapps_public and steamtype != 'dlc':
-            try:
-                steamappname = steam.get_appdata(steamid)['name']
-            except KeyError:
-                steamappname = 'removed'
+            steamappname = steamdata.get('name', 'removed')
             print("%s \'%s\' with Steam ID %s [%s] in database, is not redeemed on Steam." % \
-                    (game['AppType'], game["Name"], steamid, steamappname))
+                    (apptype, name, steamid, steamappname))
 
     # Loop through steam ids and see if they are in database
     for steamid in steamapps:
         if steamid not in steamid_in_db:
-            try:
-                steamdata = steam.get_appdata(steamid)
-            except KeyError:
-                steamdata = {'type': 'unknown', 'is_free': False}
+            steamdata = appdata.get(steamid, {'type': 'unknown', 'is_free': False})
             if steamdata['type'] == 'game' and not steamdata['is_free']:
                 print("%s \'%s\' (ID %s) in Steam account, but not in database." % \
                         (steamdata['type'].capitalize(), steamapps[steamid]['name'], steamid))
@@ -329,10 +454,10 @@ def humble_game_platforms(game) -> List[str]:
     """Given a JSON subproduct structure, return the platforms.
     Note that for Steam, the platforms are not listed."""
     if 'downloads' in game:
-        return [distribution['platform'] for distribution in game['downloads']]
+        return [download['platform'] for download in game['downloads']]
     elif game.get('platforms'):
         # TODO: what is the format of game['platforms']?
-        assert isintance(game['platforms'], list)
+        assert isinstance(game['platforms'], list)
         return game['platforms']
     else:
         logging.warning("No platform found for game {}".format(game['human_name']))
@@ -340,8 +465,7 @@ def humble_game_platforms(game) -> List[str]:
 def print_humble_purchases(humble: HumbleBundle, database: FileMaker, verbosity=0):
     """For each Humble Purchase, print the details."""
     order_list = humble.get_order_list()
-    for order in order_list:
-        order_details = humble.get_order_info(order)
+    for order, order_details in zip(order_list, humble.get_order_infos(order_list)):
         # category may be bundle (game bundle, book bundle, etc.)
         sys.stdout.write(order + '\n')
         if verbosity == 0:
@@ -353,7 +477,7 @@ def print_humble_purchases(humble: HumbleBundle, database: FileMaker, verbosity=
         else:  # verbosity if 2 or more
             include = ('category', 'machine_name', 'human_name', 'key_type', 'platform', \
                        'gamekey', 'created', 'file_size', 'platform', 'platforms', 'available')
-            ignores = ('all_coupon_data')
+            ignores = ('all_coupon_data',)
         print_dict(order_details, include, ignores, indent=1)
 
 def get_games_in_humble_order(order_details):
@@ -362,10 +486,6 @@ def get_games_in_humble_order(order_details):
     log debug messages for out-of-the ordinary data structures.
     The original order_details is augmented with a key order_details['has_expired_game']
     """
-    DESKTOP_PLATFORMS = set(['mac','windows','linux'])
-    NON_DESKTOP_PLATFORMS = set(['asmjs','android'])
-    NON_GAME_PLATFORMS = set(['audio','video','ebook'])
-    KNOWN_PLATFORMS = DESKTOP_PLATFORMS | NON_DESKTOP_PLATFORMS | NON_GAME_PLATFORMS
     order = order_details['gamekey']
     if order_details['subproducts'] or order_details['tpkd_dict']['all_tpks']:
         # An order with downloads and/or (steam) keys
@@ -394,8 +514,8 @@ def get_games_in_humble_order(order_details):
             order_details['has_expired_game'] = True
         if 'downloads' in game:
             distribution = 'humblebundle' # Humble Bundle is the distributor
-            platforms = set([distribution['platform'] for distribution in game['downloads']])
-            for platform in (platforms - KNOWN_PLATFORMS):
+            platforms = {download['platform'] for download in game['downloads']}
+            for platform in (platforms - _KNOWN_PLATFORMS):
                 logging.warning("Unknown platform {} for game {} in Humble Bundle order {}".format(
                             platform, game['human_name'], order
                 ))
@@ -429,18 +549,16 @@ def get_games_in_humble_order(order_details):
                     ))
                 distribution = 'unknown'
                 must_include = False
-            elif (platforms & DESKTOP_PLATFORMS):
+            elif (platforms & _DESKTOP_PLATFORMS):
                 # regular game
                 pass
-            elif (platforms & NON_DESKTOP_PLATFORMS):
-                logging.debug("Ignore non-desktop ({}) game {} in Humble Bundle order {}".format(
-                            ', '.join(platforms), game['human_name'], order
-                ))
+            elif (platforms & _NON_DESKTOP_PLATFORMS):
+                logging.debug("Ignore non-desktop (%s) game %s in Humble Bundle order %s",
+                            _LazyJoin(platforms), game['human_name'], order)
                 must_include = False
             else:
-                logging.debug("Ignore non-game ({}) item {} in Humble Bundle order {}".format(
-                            ', '.join(platforms), game['human_name'], order
-                ))
+                logging.debug("Ignore non-game (%s) item %s in Humble Bundle order %s",
+                            _LazyJoin(platforms), game['human_name'], order)
                 continue
         elif 'key_type' in game:
             if game['key_type'] in ('steam', 'desura', 'blizzard', 'gog', 'ouya', 'telltale', 'arenanet'):
@@ -472,11 +590,10 @@ def get_games_in_humble_order(order_details):
 
 def merge_games_in_humble_order(game_list):
     """Given a list of games, merge games with equal names."""
-    pruned_name_list = []
     game_dict = {}
     for game in game_list:
         game_name = game['human_name']
-        if game_name in pruned_name_list:
+        if game_name in game_dict:
             same_game = game_dict[game_name]
             # TODO: merge game dict into same_game dict
             assert same_game['order'] == game['order']
@@ -487,9 +604,8 @@ def merge_games_in_humble_order(game_list):
                 same_game['distribution'] += ', ' + game['distribution']
             same_game['must_include'] = same_game['must_include'] or game['must_include']
         else:
-            pruned_name_list.append(game_name)
             game_dict[game_name] = game
-    for game_name in sorted(pruned_name_list):
+    for game_name in sorted(game_dict):
         yield game_dict[game_name]
 
 
@@ -497,7 +613,7 @@ def add_humble_purchase(humble: HumbleBundle, database: FileMaker, humbleorder:
     """Given a Humble Bundle order, add the purchases to the database.
     Does not check if the information is already there. It just adds it."""
     order_details = humble.get_order_info(humbleorder)
-    purchasetime = datetime.strptime(order_details['created'], '%Y-%m-%dT%H:%M:%S.%f')
+    purchasetime = humble_order_created(order_details)
     dates = [purchasetime.date().isoformat()]
     date = (purchasetime + timedelta(hours=5)).date().isoformat()
     # TODO: to be written
@@ -515,12 +631,21 @@ def add_humble_purchase(humble: HumbleBundle, database: FileMaker, humbleorder:
     #, width=120, indent=4)
     
 
+def humble_order_created(order_details) -> datetime:
+    """Return the purchase time of a Humble Bundle order."""
+    try:
+        return datetime.fromisoformat(order_details['created'])
+    except (AttributeError, ValueError):
+        # datetime.fromisoformat was introduced in Python 3.7
+        return datetime.strptime(order_details['created'], '%Y-%m-%dT%H:%M:%S.%f')
+
 def get_humble_order_dates(order_details):
     """Give the order details, return 1 or 2 possible dates taken into account that 
-    purchase may have been done in a different time-zone."""
-    purchasetime = datetime.strptime(order_details['created'], '%Y-%m-%dT%H:%M:%S.%f')
-    dates = [purchasetime.date().isoformat()]
-    date = (purchasetime + timedelta(hours=5)).date().isoformat()
+    purchase may have been done in a different time-zone.
+    The dates are date objects, like the PurchaseDate in the database."""
+    purchasetime = humble_order_created(order_details)
+    dates = [purchasetime.date()]
+    date = (purchasetime + timedelta(hours=5)).date()
     if date not in dates:
         dates.append(date)
     return dates
@@ -536,25 +661,24 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
     empty_orders = set()
     expired_orders = set()
     # order_list = ['zUDt5EqrxRbwpNMZ', 'ZxbxH8vdpEuRf6em']
-    DESKTOP_PLATFORMS = set(['mac','windows','linux'])
-    NON_DESKTOP_PLATFORMS = set(['asmjs','android'])
-    NON_GAME_PLATFORMS = set(['audio','video','ebook'])
-    KNOWN_PLATFORMS = DESKTOP_PLATFORMS | NON_DESKTOP_PLATFORMS | NON_GAME_PLATFORMS
     
-    # Build data structure: order_by_date[date][game] = [list of game_details]
-    def factory():
-        return defaultdict(set)
-    order_by_date = defaultdict(factory)  # type: Dict[str, Dict[str, Set[Tuple[str,bool,Dict[str, Any]]]]]
-    duplicate_games = defaultdict(factory)  # type: Dict[str, Dict[str, Set[str]]]
+    # Build data structure: order_by_date[(date, game)] = game_details
+    order_by_date = {}  # type: Dict[Tuple[Date, str], Dict[str, Any]]
+    duplicate_games = defaultdict(set)  # type: Dict[Tuple[Date, str], Set[str]]
+    order_details_by_id = {}  # type: Dict[str, Dict[str, Any]]
+    # possible purchase dates of each order, so the creation time is only parsed once
+    order_dates_by_id = {}  # type: Dict[str, List[Date]]
     total_game_count = 0
     total_other_count = 0
-    for order in humble_order_list:
+    # order details are fetched concurrently, so the database loop below only needs dict lookups
+    for order, order_details in zip(humble_order_list, humble.get_order_infos(humble_order_list)):
         game_count = 0
         other_count = 0
-        order_details = humble.get_order_info(order)
+        order_details_by_id[order] = order_details
         order_name = order_details['product']['human_name'].strip()
         order_machine_name = order_details['product']['machine_name']
         dates = get_humble_order_dates(order_details)
+        order_dates_by_id[order] = dates
         
         if order_details['product']['category'] == 'subscriptionplan':
             continue
@@ -566,17 +690,17 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
                 other_count += 1
                 total_other_count += 1
             for date in dates:
-                human_name = game['human_name']
-                if order_by_date[date][human_name]:
-                    o_game = order_by_date[date][human_name]
+                key = (date, game['human_name'])
+                o_game = order_by_date.get(key)
+                if o_game:
                     if o_game['order_id'] != order:
-                        duplicate_games[date][human_name].add(o_game['order_id'])
-                        duplicate_games[date][human_name].add(order)
+                        duplicate_games[key].add(o_game['order_id'])
+                        duplicate_games[key].add(order)
                     # same order, same date, same human_name.
                     game['distribution'] += o_game['distribution']
                     game['must_include'] = game['must_include'] or o_game['must_include']
                 game['order_id'] = order
-                order_by_date[date][human_name] = game
+                order_by_date[key] = game
 
                 # order_by_date[date][game['human_name']].add((order, is_game, game))
         if order_details['has_expired_game']:
@@ -585,9 +709,9 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
         if game_count:
             game_orders.add(order)
         elif order_machine_name.endswith('_bookbundle') or order_machine_name.endswith('_bookrebundle'):
-            logging.debug("Humble Bundle order %s of %s (%s) is book bundle without games" % (order, date, order_name))
+            logging.debug("Humble Bundle order %s of %s (%s) is book bundle without games", order, date, order_name)
         elif order_machine_name.endswith('_softwarebundle'):
-            logging.debug("Humble Bundle order %s of %s (%s) is software bundle without games" % (order, date, order_name))
+            logging.debug("Humble Bundle order %s of %s (%s) is software bundle without games", order, date, order_name)
         elif order_details['has_expired_game']:
             logging.warning("Humble Bundle order %s of %s (%s) has no games because it is expired" % (order, date, order_name))
         elif other_count:
@@ -600,48 +724,75 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
     logging.info('Found %d games or game keys and %d other items in Humble Bundle purchases.' % 
                 (total_game_count, total_other_count))
     
-    for date in sorted(duplicate_games.keys()):
-        for game, orders in duplicate_games[date].items():
-            logging.warning("Multiple purchases of %s on %s: Humble bundle orders %s" % \
-                        (game, date, ', '.join(list(orders))))
-    # order_by_date is now filled
+    for (date, game), orders in sorted(duplicate_games.items()):
+        logging.warning("Multiple purchases of %s on %s: Humble bundle orders %s",
+                    game, date, _LazyJoin(orders))
+    # order_by_date is now filled. Index the games per date, as
+    # (list of names, name -> [order_id], casefolded name -> [order_ids]).
+    games_by_date = {}  # type: Dict[Date, Tuple[List[str], Dict[str, List[str]], Dict[str, List[str]]]]
+    for (date, human_name), game in order_by_date.items():
+        if date not in games_by_date:
+            games_by_date[date] = ([], {}, defaultdict(list))
+        game_names, game_purchases, casefolded_purchases = games_by_date[date]
+        game_names.append(human_name)
+        game_purchases[human_name] = [game['order_id']]
+        casefolded_purchases[human_name.casefold()].append(game['order_id'])
     
     # Loop all Humble Bundle games in the database, and determine the HumbleOrder, if not set
     logging.info("Query database for Purchases")
     fields = ('Name', 'AppType', 'SteamAppId', 'HumbleSlug', 'HumbleOrder', 'Distribution',
               'Gift', 'PriceType', 'StoreURL', 'PurchaseDate', 'Bundle', 'GameIdentifier', 'Note')
-    where = "Vendor LIKE '%Humble Bundle%' OR Distribution LIKE '%Humble Bundle%'"
+    where = "Vendor LIKE ? OR Distribution LIKE ?"
+    wherevalues = ('%Humble Bundle%', '%Humble Bundle%')
     order = "PurchaseDate"
     seen_orders = set()
+    known_orders = game_orders | empty_orders | expired_orders
+    # (where, update) pairs, sent to the database in batches
+    pending_updates = []  # type: List[Tuple[Dict[str, Any], Dict[str, Any]]]
     changecount = 0
     missing_order_count = 0
     gamecount = 0
-    for record in database.select(fields, 'Purchases', where, order):  # type: Dict[str, Any]
+    for record in database.select(fields, 'Purchases', where, order, 
+                                  wherevalues=wherevalues):  # type: Dict[str, Any]
         name = record['Name']
         alias = record['GameIdentifier']
         names = [name]
         if alias and alias != name:
             names.append(alias)
         if record['Note']:
-            m = re.search(r'known as (.*?)(\.|$)', record['Note'], flags=re.IGNORECASE)
+            m = _KNOWN_AS_RE.search(record['Note'])
             if m:
                 names.append(m.group(1))
 
-        acquire_date = record['PurchaseDate'].isoformat()
+        acquire_date = record['PurchaseDate']  # type: Date
         # print(type(acquire_date), acquire_date)
-        if acquire_date in order_by_date:
-            game_purchases = {name: [order['order_id']] for name, order in order_by_date[acquire_date].items()}
-            possible_ids = find_possible_matches(*names, name_values=game_purchases, cutoff=0.8)
-            possible_ids = set(possible_ids)  # remove duplicates
+        if acquire_date in games_by_date:
+            game_names, game_purchases, casefolded_purchases = games_by_date[acquire_date]
+            # Names which are equal, ignoring case, do not need a fuzzy match.
+            # Like find_possible_matches(), prefer an exact match, and use the first name that matches.
+            possible_ids = set()
+            for n in names:
+                if n in game_purchases:
+                    possible_ids = set(game_purchases[n])
+                    break
+            else:
+                for n in names:
+                    order_ids = casefolded_purchases.get(n.casefold())
+                    if order_ids:
+                        possible_ids = set(order_ids)
+                        break
+            if not possible_ids:
+                possible_ids = find_possible_matches(*names, name_values=game_purchases, cutoff=0.8,
+                                                     choices=game_names)
+                possible_ids = set(possible_ids)  # remove duplicates
         else:
             # logging.warning("No Humble Bundle purchases found on %s" % (acquire_date))
             possible_ids = set()
         gamecount += 1
-        orders_in_database = [humbleorder.strip() for humbleorder in record['HumbleOrder'].split(',')] \
+        orders_in_database = _ORDER_SPLIT_RE.split(record['HumbleOrder'].strip()) \
                     if record['HumbleOrder'] else []
-        for humbleorder in orders_in_database:
-            seen_orders.add(humbleorder)
-        s_orders_in_database = set(orders_in_database)
+        seen_orders.update(orders_in_database)
+        s_orders_in_database = frozenset(orders_in_database)
         if not orders_in_database:
             missing_order_count += 1
         
@@ -666,29 +817,34 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
         elif possible_ids == s_orders_in_database:
             continue
         elif orders_in_database:
-            if not (s_orders_in_database - possible_ids):
+            only_in_db = s_orders_in_database - possible_ids
+            only_in_purchases = possible_ids - s_orders_in_database
+            if not only_in_db:
                 # Additional IDs found. Don't add to database
-                logging.warning("Purchase of %s on %s lists Humble Order(s) %s, found additional order(s) in purchases: %s" %
-                        (name, acquire_date, ', '.join(orders_in_database), ', '.join(possible_ids - s_orders_in_database)))
-            elif (possible_ids - s_orders_in_database):
+                logging.warning("Purchase of %s on %s lists Humble Order(s) %s, found additional order(s) in purchases: %s",
+                        name, acquire_date, _LazyJoin(orders_in_database), _LazyJoin(only_in_purchases))
+            elif only_in_purchases:
                 # Orders found in purchases, which are not in database. 
                 # Also: orders in database, not found in purchases.
-                logging.warning("Purchase of %s on %s lists Humble Order(s) %s, found different order(s) in purchases: %s" %
-                        (name, acquire_date, ', '.join(orders_in_database), ', '.join(possible_ids - s_orders_in_database)))
+                logging.warning("Purchase of %s on %s lists Humble Order(s) %s, found different order(s) in purchases: %s",
+                        name, acquire_date, _LazyJoin(orders_in_database), _LazyJoin(only_in_purchases))
             else:
-                for order_id in (s_orders_in_database - possible_ids):
+                for order_id in only_in_db:
                     # Order ID in database, but nothing found by that name and date.
                     # Check if order ID is known, and if so, if purchase date matches.
-                    if order_id not in (game_orders | empty_orders | expired_orders):
+                    if order_id not in known_orders:
                         if record['Gift'] == 'Given away':
                             # Given away orders are not listed anymore.
                             expired_orders.add(order_id)
+                            known_orders.add(order_id)
                         else:
                             logging.warning("Purchase of %s on %s lists Humble Order %s, which is not a known purchases order ID." %
                                      (name, acquire_date, order_id))
                     else:
-                        order_details = humble.get_order_info(order_id)
-                        order_dates = get_humble_order_dates(order_details)
+                        order_dates = order_dates_by_id.get(order_id)
+                        if order_dates is None:
+                            # Given away order, seen in an earlier record. It has no order details.
+                            continue
                         if acquire_date not in order_dates:
                             logging.warning("Purchase of %s on %s lists Humble Order %s, but that order was made on %s" %
                              (name, acquire_date, order_id, order_dates[0]))
@@ -699,7 +855,7 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
             continue
         else:
             assert len(possible_ids) == 1
-            humbleorder = list(possible_ids)[0]
+            humbleorder = next(iter(possible_ids))
             print("Humble Bundle purchase found on %s for %s: %s" % \
                     (acquire_date, name, humbleorder))
             
@@ -708,14 +864,18 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
                 'Name': name,
                 'GameIdentifier': alias,
                 'AppType': record['AppType'],
-                'PurchaseDate': acquire_date
+                'PurchaseDate': acquire_date.isoformat()
             }
             update = {'HumbleOrder': humbleorder}
             if not dry_run:
-                rowcount = database.update('Purchases', uwhere, update)
-                if rowcount != 1:
-                    logging.info("Updated (but not committed) %s records" % (rowcount))
-                changecount += rowcount
+                pending_updates.append((uwhere, update))
+                if len(pending_updates) >= 100:
+                    database.update_many('Purchases', pending_updates)
+                    changecount += len(pending_updates)
+                    pending_updates = []
+    if pending_updates:
+        database.update_many('Purchases', pending_updates)
+        changecount += len(pending_updates)
     
     # done looping over all games in the database
     # now report the results
@@ -727,22 +887,22 @@ def add_humble_orderids(humble: HumbleBundle, database: FileMaker, add_missing=F
         logging.info("Committed all updates to the database")
     
     def sorted_order_details(order_id_iterable):
-        orderlist = [humble.get_order_info(order) for order in order_id_iterable]
-        orderlist.sort(key=lambda order_details: order_details['created'])
-        return orderlist
+        # sort (created, order_id) tuples, rather than calling a key function per order
+        pairs = [(order_details_by_id[order]['created'], order) for order in order_id_iterable]
+        pairs.sort()
+        return [order_details_by_id[order] for created, order in pairs]
     # loop over remaining orders for orders
-    for order_id in (seen_orders - game_orders - empty_orders - expired_orders):
+    for order_id in seen_orders.difference(game_orders, empty_orders, expired_orders):
         logging.warning("Unknown Humble Bundle order %r in database" % (order_id, ))
-    for order_details in sorted_order_details(empty_orders - seen_orders):
+    for order_details in sorted_order_details(empty_orders.difference(seen_orders)):
         order_id = order_details['gamekey']
         order_name = order_details['product']['human_name'].strip()
         logging.warning("Humble Bundle order %s (%s) is not in the database, and has no content." % \
                         (order_id, order_name))
-    for order_details in sorted_order_details(game_orders - seen_orders - expired_orders):
+    for order_details in sorted_order_details(game_orders.difference(seen_orders, expired_orders)):
         order_id = order_details['gamekey']
         order_name = order_details['product']['human_name'].strip()
-        purchasetime = datetime.strptime(order_details['created'], '%Y-%m-%dT%H:%M:%S.%f')
-        date = purchasetime.date().isoformat()
+        date = order_dates_by_id[order_id][0].isoformat()
         if add_missing:
             logging.warning("Humble Bundle order %s of %s (%s) is not in database" % (order_id, date, order_name))
             ## add_humble_purchase(humble, database, order)
@@ -768,14 +928,13 @@ def verify_humble_purchases(humble: HumbleBundle, database: FileMaker):
     
     order_list = humble.get_order_list()
     # order_list = ['zUDt5EqrxRbwpNMZ', 'ZxbxH8vdpEuRf6em']
-    for order in order_list:
-        order_details = humble.get_order_info(order)
+    for order, order_details in zip(order_list, humble.get_order_infos(order_list)):
         # category may be bundle (game bundle, book bundle, etc.)
         # 
         sys.stdout.write(order + '\n')
         # print_dict(order_details, ('category', 'machine_name'),
         #         ('downloads', 'payee', 'all_coupon_data'))
-        print_dict(order_details, ('category', 'machine_name', 'human_name', 'key_type', 'platform', 'gamekey', 'created', 'file_size'), ('all_coupon_data'))
+        print_dict(order_details, ('category', 'machine_name', 'human_name', 'key_type', 'platform', 'gamekey', 'created', 'file_size'), ('all_coupon_data',))
         # print_dict(order_details, ('category', 'key_type'), ('downloads', 'all_coupon_data'))
         # print(order_details['product']['category'], order_details['product']['machine_name'],
         #         order)
@@ -788,10 +947,21 @@ def find_missing_gog_ids():
 def find_missing_wikidata_ids():
     pass
 
+# (part of URL, distribution platform) of known stores
+_STORE_URL_DESTINATIONS = (
+    ("steampowered.com", "Steam"),
+    ("gog.com", "Gog"),
+    ("humblebundle.com", "Humble Bundle"),
+)
+
+def _store_url_destination(url: str, default: str) -> str:
+    """Return the distribution platform of a store URL, or default for other stores."""
+    return next((destination for part, destination in _STORE_URL_DESTINATIONS if part in url), default)
+
 def print_gift_list(database: FileMaker, format='mediawiki', output: TextIO=sys.stdout):
     """Print a list of games that I still like to give away."""
     fields = ('Name','DLC','AppType','Parent','Distribution','Platforms','Note','Price', \
-            'SteamAppId','StoreURL')
+            _STEAM_APP_ID_FIELD,'StoreURL')
     where = "Gift = 'Ungifted gift'"
     order = "GameIdentifier"
     games = []
@@ -818,19 +988,12 @@ def print_gift_list(database: FileMaker, format='mediawiki', output: TextIO=sys.
         distrib_uncommon = [distrib for distrib in distribution_urls.keys() \
                 if distrib not in ('Steam', 'Gog', 'Humble Bundle')]
         if not game['StoreURL']:
-            game['StoreURL'] = "http://store.steampowered.com/app/%s/" % (int(game['SteamAppId']))
+            game['StoreURL'] = "http://store.steampowered.com/app/%s/" % (game['SteamAppId'])
+        # destination of URLs of other stores
+        default_destination = distrib_uncommon[0] if len(distrib_uncommon) == 1 else "Store"
         for url in game['StoreURL'].split(','):
             url = url.strip()
-            if "steampowered.com" in url:
-                destination = "Steam"
-            elif "gog.com" in url:
-                destination = "Gog"
-            elif "humblebundle.com" in url:
-                destination = "Humble Bundle"
-            elif len(distrib_uncommon) == 1:
-                destination = distrib_uncommon[0]
-            else:
-                destination = "Store"
+            destination = _store_url_destination(url, default_destination)
             if destination in distribution_urls:
                 distribution_urls[destination].append(url)
             else:
@@ -923,6 +1086,12 @@ class ChoicesAction(argparse.Action):
         return self._choices_actions
 
 
+# key [= value] [# comment] line in a config file
+_CFG_LINE_RE = re.compile(r'^(?P<key>\w+)\s*' 
+                          r'(?:(?P<equal>[:=\s])\s*([\'"]?)(?P<value>.+?)?\3)?'
+                          r'\s*(?:\s[;#]\s*(?P<comment>.*?)\s*)?$')
+
+
 class ConfigFileParser(configargparse.DefaultConfigFileParser):
     def parse(self, stream):
         """Parses the keys + values from a config file."""
@@ -933,21 +1102,26 @@ class ConfigFileParser(configargparse.DefaultConfigFileParser):
             if not line or line[0] in ["#", ";", "["] or line.startswith("---"):
                 continue
             
-            match = re.match(r'^(?P<key>\w+)\s*' 
-                             r'(?:(?P<equal>[:=\s])\s*([\'"]?)(?P<value>.+?)?\3)?'
-                             r'\s*(?:\s[;#]\s*(?P<comment>.*?)\s*)?$', line)
-            if not match:
-                raise configargparse.ConfigFileParserException("Unexpected line %s in %s: %s" % 
-                        (i, getattr(stream, 'name', 'stream'), line))
-            
-            key = match.group('key')
-            equal = match.group('equal')
-            value = match.group('value')
-            # comment = match.group('comment')
-            if value is None and equal is not None and equal != ' ':
-                # distinguish "key = " (value = '')
-                # from simply "key" (value = None)
-                value = ''
+            key, equal, value = line.partition('=')
+            key = key.rstrip()
+            value = value.lstrip()
+            if equal and key.replace('_', 'a').isalnum() and not any(c in value for c in '\'";#'):
+                # fast path for simple "key = value" lines, without quotes or comments
+                pass
+            else:
+                match = _CFG_LINE_RE.match(line)
+                if not match:
+                    raise configargparse.ConfigFileParserException("Unexpected line %s in %s: %s" % 
+                            (i, getattr(stream, 'name', 'stream'), line))
+                
+                key = match.group('key')
+                equal = match.group('equal')
+                value = match.group('value')
+                # comment = match.group('comment')
+                if value is None and equal is not None and equal != ' ':
+                    # distinguish "key = " (value = '')
+                    # from simply "key" (value = None)
+                    value = ''
             
             if value is None:  # key-only
                 value = 'true'
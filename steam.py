@@ -3,13 +3,32 @@
 """Interface to Steam"""
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# optional external libraries, to keep the large app list out of memory
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+try:
+    import json_stream
+except ImportError:
+    json_stream = None
+# optional external library, for faster XML parsing
+try:
+    from lxml.etree import iterparse
+    # lxml only reports the requested elements
+    _ITERPARSE_KWARGS = {'tag': ('error', 'steamID64', 'game')}  # type: Dict[str, Any]
+except ImportError:
+    from xml.etree.ElementTree import iterparse
+    _ITERPARSE_KWARGS = {}
 
 # Type hints
 try:
-    from typing import Dict, Any
+    from typing import Dict, Any, Iterable, Iterator, Optional
 except ImportError:
     from collections import defaultdict
-    Dict = defaultdict(str)  # type: ignore
+    Dict = Iterable = Iterator = Optional = defaultdict(str)  # type: ignore
     Any = ''  # type: ignore
 
 # local module (only used here for type hints)
@@ -21,38 +40,88 @@ class Steam:
     OWNED_GAME_LIST_1_URL = 'https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/' \
         '?key={apikey}&steamid={userid}&include_appinfo=1&include_played_free_games=1&format=json'
     OWNED_GAME_LIST_2_URL = 'https://steamcommunity.com/id/{username}/games?tab=all&xml=1'
-    GAME_INFO_URL = 'https://store.steampowered.com/api/appdetails?appids={appid}'
+    # %-templates, which are cheaper than str.format() for the many app detail lookups.
+    # %s rather than %d, since Steam IDs read from the database may be strings.
+    GAME_INFO_URL = 'https://store.steampowered.com/api/appdetails?appids=%s'
+    GAME_INFO_CACHE = 'steam_appdetails_%s.json'
     
     def __init__(self, apikey: str, steamid: int, steamusername: str, downloader: CachedDownloader) -> None:
         self.apikey = apikey
         self.steamid = steamid
         self.steamusername = steamusername
         self.downloader = downloader
+        self._appdata_cache = {}  # type: Dict[int, Dict[str, Any]]
+        # One lock per Steam ID, so that concurrent lookups of the same ID only fetch it once.
+        self._appdata_locks = {}  # type: Dict[int, threading.Lock]
 
     def get_all_ids(self) -> Dict[int, str]:
         """Return a dict with steam ID -> name for all available games."""
-        j = self.downloader.get_cached_json(self.FULL_GAME_LIST_URL,
-                'steam_applist.json', ttl=3)
+        # Store the resulting dict, so that it is not rebuilt from the large list as long as 
+        # the list is not downloaded again.
+        return self.downloader.get_cached_derived('steam_applist.json', ttl=3, 
+                derive_func=self._build_all_ids)
+
+    def _build_all_ids(self) -> Dict[int, str]:
         steamids = {}  # type: Dict[int, str]
-        for d in j['applist']['apps']:
+        for d in self._iter_all_apps():
             try:
-                if int(d['appid']) in steamids:
-                    logging.warning("Duplicate ID %s: %s and %s" % \
-                            (d['appid'], steamids[int(d['appid'])], d['name']))
-                else:
-                    steamids[int(d['appid'])] = d['name']
+                appid = int(d['appid'])
+                name = d['name']
             except KeyError:
                 logging.warning("Unexpected JSON format. Expected {'appid': ..., 'name': ...}. " \
-                          "Found %s" % d)
+                          "Found %s", dict(d))
                 continue
+            previous = steamids.get(appid)
+            if previous is not None:
+                logging.warning("Duplicate ID %s: %s and %s", appid, previous, name)
+            else:
+                steamids[appid] = name
         return steamids
 
+    def _iter_all_apps(self) -> Iterator[Dict[str, Any]]:
+        """Yield the {'appid': ..., 'name': ...} dicts in the list of all available games."""
+        # The list is large. simdjson only decodes the values that are read.
+        # Without it, json_stream reads the cache file piece by piece instead of 
+        # decoding the whole list at once.
+        if simdjson is None and json_stream is not None:
+            try:
+                with self.downloader.get_cached_stream(self.FULL_GAME_LIST_URL,
+                        'steam_applist.json', ttl=3) as f:
+                    for d in json_stream.load(f)['applist']['apps']:
+                        yield json_stream.to_standard_types(d)
+            except ValueError as e:
+                # Do not keep the invalid download in the cache.
+                self.downloader.discard_cache('steam_applist.json')
+                logging.error("Can't decode %s: %s" % (self.FULL_GAME_LIST_URL, e))
+                raise ValueError("Failed to download data from %s" % self.FULL_GAME_LIST_URL) from None
+        else:
+            j = self.downloader.get_cached_json_simd(self.FULL_GAME_LIST_URL,
+                    'steam_applist.json', ttl=3)
+            yield from j['applist']['apps']
+
     def get_appdata(self, appid: int) -> Dict[str, Any]:
         """Given a Steam ID, return the data. It will follow any symlink. 
         May raise a KeyError if no data is found.
-        May raise a IOError if no data can be downloaded."""
-        j = self.downloader.get_cached_json(self.GAME_INFO_URL.format(appid=appid),
-                'steam_appdetails_%s.json' % (appid), ttl=20, may_extend_cache=True)
+        May raise a IOError if no data can be downloaded.
+        The result is kept in memory, so each ID is only looked up once, 
+        also if multiple threads ask for the same ID."""
+        try:
+            return self._appdata_cache[appid]
+        except KeyError:
+            pass
+        # dict.setdefault() is atomic, so all threads get the same lock.
+        with self._appdata_locks.setdefault(appid, threading.Lock()):
+            try:
+                return self._appdata_cache[appid]
+            except KeyError:
+                pass
+            data = self._load_appdata(appid)
+            self._appdata_cache[appid] = data
+        return data
+
+    def _load_appdata(self, appid: int) -> Dict[str, Any]:
+        j = self.downloader.get_cached_json(self.GAME_INFO_URL % appid,
+                self.GAME_INFO_CACHE % appid, ttl=20, may_extend_cache=True)
         try:
             j = j[str(appid)]
             success = j['success']
@@ -74,6 +143,21 @@ class Steam:
         else:
             return j['data']
 
+    def get_appdata_many(self, appids: Iterable[int], max_workers: int=8) -> Dict[int, Dict[str, Any]]:
+        """Given Steam IDs, return a dict appid->data, like get_appdata().
+        The data is fetched concurrently. IDs without data are omitted.
+        May raise a IOError if no data can be downloaded."""
+        appids = list(appids)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(self._get_appdata_or_none, appids)
+            return {appid: data for appid, data in zip(appids, results) if data is not None}
+
+    def _get_appdata_or_none(self, appid: int) -> Optional[Dict[str, Any]]:
+        try:
+            return self.get_appdata(appid)
+        except KeyError:
+            return None
+
     def get_userapps(self, userid: int=None) -> Dict[int, Dict[str, Any]]:
         """Return a dict of appid->dict with information about all games that a users owns.
         Use the private API. Somehow, this does not return all owned games."""
@@ -102,30 +186,47 @@ class Steam:
             username = self.steamusername
         url = self.OWNED_GAME_LIST_2_URL.format(apikey=self.apikey, username=username)
         cachefile = 'steam_ownedgames_%s.xml' % (username)
-        x = self.downloader.get_cached_xml(url, cachefile, ttl=1.2)
-        err = x.find('error')
-        if err is not None: # Element may exist but still resolve to False.
-            logging.warning("Unexpected Error while reading %s (%s): %s" % (cachefile, url, err.text))
-            raise KeyError("Unexpected XML response in steamcommunity.com/id/%s/games" % (username))
+        games = {}
+        userid_from_username = None
+        # Parse the XML incrementally, and discard each <game> element once it is read.
         try:
-            userid_from_username = int(x.find('steamID64').text)
-        except Exception as exc:
-            print(x)
-            print(err)
-            print(exc)
+            with self.downloader.get_cached_stream(url, cachefile, ttl=1.2) as f:
+                for _, elem in iterparse(f, **_ITERPARSE_KWARGS):
+                    tag = elem.tag
+                    if tag == 'game':
+                        findtext = elem.findtext
+                        try:
+                            appid = int(findtext('appID'))
+                        except (TypeError, ValueError):
+                            logging.error("Unexpected XML format in steamcommunity.com/id/<username>/games. " \
+                                    "Expected <gamesList><games><game><appID>...</appID><name>...</name><logo>...</logo></game> .... </games></gameList>")
+                            raise KeyError("XML error while getting data for username %s" % (username))
+                        games[appid] = {'appid': appid, 'name': findtext('name'), 
+                                        'img_logo_url': findtext('logo')}
+                        elem.clear()
+                    elif tag == 'steamID64':
+                        try:
+                            userid_from_username = int(elem.text)
+                        except (TypeError, ValueError) as exc:
+                            logging.exception("Failed to parse steamID64 in %s", cachefile)
+                            raise KeyError("Unexpected steamID64 in steamcommunity.com/id/%s/games" % (username)) \
+                                    from exc
+                        self._check_userid(userid, username, userid_from_username)
+                    elif tag == 'error':
+                        logging.warning("Unexpected Error while reading %s (%s): %s" % (cachefile, url, elem.text))
+                        raise KeyError("Unexpected XML response in steamcommunity.com/id/%s/games" % (username))
+        except SyntaxError as e:
+            # XML parse errors are a SyntaxError. Do not keep the invalid download in the cache.
+            self.downloader.discard_cache(cachefile)
+            logging.error("Can't decode %s from %s: %s" % (cachefile, url, e))
+            raise ValueError("Failed to download data from %s" % url) from None
+        if userid_from_username is None:
+            self._check_userid(userid, username, userid_from_username)
+        return games
+
+    @staticmethod
+    def _check_userid(userid: int, username: str, userid_from_username: Optional[int]) -> None:
         if userid_from_username != userid:
             logging.error("Steam ID mismatch. " \
-                    "Steam username %s returns Steam ID %d, not %d." % (username, userid_from_username, userid))
+                    "Steam username %s returns Steam ID %s, not %d." % (username, userid_from_username, userid))
             raise KeyError("Mismatch between Steam ID %d and username %s" % (userid, username))
-        games = {}
-        try:
-            for game in x.find('games'):
-                appid = int(game.find('appID').text)
-                name = game.find('name').text
-                img_logo_url = game.find('logo').text
-                games[appid] = {'appid': appid, 'name': name, 'img_logo_url': img_logo_url}
-        except KeyError:
-            logging.error("Unexpected XML format in steamcommunity.com/id/<username>/games. " \
-                    "Expected <gamesList><games><game><appID>...</appID><name>...</name><logo>...</logo></game> .... </games></gameList>")
-            raise KeyError("XML error while getting data for username %s" % (username))
-        return games